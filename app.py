@@ -4,15 +4,29 @@ import hashlib
 import requests
 import csv
 import io
+import sqlite3
+import threading
+import time
+import math
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import closing, contextmanager
 try:
     import magic
     MAGIC_AVAILABLE = True
 except ImportError:
     MAGIC_AVAILABLE = False
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
 from datetime import datetime
 from flask import Flask, request, jsonify, render_template_string, Response
 from flask_cors import CORS
+import click
 from werkzeug.utils import secure_filename
+from werkzeug.middleware.proxy_fix import ProxyFix
 from functools import wraps
 import PyPDF2
 import pdfplumber
@@ -21,12 +35,18 @@ from openai import OpenAI
 from dotenv import load_dotenv
 import re
 from openpyxl import Workbook
+from ocr_worker import OCR_AVAILABLE, ocr_pdf_pages
 
 load_dotenv()
 
 app = Flask(__name__)
 CORS(app)
 
+# Number of reverse proxies in front of the app (1 on Cloud Run); X-Forwarded-For is ignored when 0
+TRUSTED_PROXY_COUNT = int(os.getenv('TRUSTED_PROXY_COUNT', '0'))
+if TRUSTED_PROXY_COUNT > 0:
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=TRUSTED_PROXY_COUNT)
+
 US_STATES = [
     "alabama","alaska","arizona","arkansas","california","colorado","connecticut","delaware","florida","georgia",
     "hawaii","idaho","illinois","indiana","iowa","kansas","kentucky","louisiana","maine","maryland","massachusetts",
@@ -57,15 +77,96 @@ ALLOWED_MIME_TYPES = {
 }
 MAX_FILE_SIZE = 10 * 1024 * 1024  # 10MB
 CANDIDATES_DB_FILE = 'candidates_db.json'
+CANDIDATE_DETAILS_FOLDER = 'candidate_details'
+OCR_CACHE_FOLDER = 'ocr_cache'
 SCORING_SETTINGS_FILE = 'scoring_settings.json'
+RATE_LIMITS_FILE = 'rate_limits.json'
+SEARCH_INDEX_FILE = 'search_index.db'
+SEARCH_INDEX_DIRTY_FILE = 'search_index.dirty'
+SEARCH_INDEX_VERSION = 4
+STATS_FILE = 'candidate_stats.json'
+CANDIDATES_LOCK_FILE = 'candidates_db.lock'
+STATS_DIMENSIONS = ['tier_level', 'service_location', 'primary_language']
+SEARCH_FACETS = ['tier_level', 'language', 'service_location', 'education', 'role_relevance']
+SEARCH_COUNT_COLUMNS = ['status', 'tier_level', 'service_location', 'education', 'role_relevance']
+SEARCH_FACET_INDEXES = {
+    'tier_level': 'idx_candidate_tier',
+    'service_location': 'idx_candidate_location',
+    'education': 'idx_candidate_education',
+    'role_relevance': 'idx_candidate_role',
+}
+SEARCH_MAX_LIMIT = 200
+# Text searches matching more candidates than this count facets over the best-ranked matches only
+SEARCH_EXACT_FACET_LIMIT = int(os.getenv('SEARCH_EXACT_FACET_LIMIT', '2000'))
+
+# Enumerated values are stored in candidates_db.json as their index in these lists.
+# Append new values only; reordering would change the meaning of stored records.
+CANDIDATE_STATUSES = ['uploaded', 'processed', 'failed', 'duplicate']
+PARSED_DATA_ENUMS = {
+    'tier_level': ['Tier 1', 'Tier 2', 'Tier 3'],
+    'qualify': ['Yes - Qualified', 'Not Qualified'],
+    'education': [
+        "None", "Associate's Degree", "Bachelor's Degree", "Currently Enrolled - Graduate",
+        "Currently Enrolled - Undergraduate", "Doctorate (Ph.D.)", "Graduate", "High School Diploma",
+        "Master's Degree", "No Formal Education", "Post Graduate", "Professional Degree",
+        "Some College (No Degree)", "Undergraduate"
+    ],
+}
+CANDIDATE_TIMESTAMPS = ['uploaded_at', 'processed_at', 'zoho_synced_at']
 
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+os.makedirs(CANDIDATE_DETAILS_FOLDER, exist_ok=True)
+os.makedirs(OCR_CACHE_FOLDER, exist_ok=True)
 
 client = OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
 ZOHO_FLOW_WEBHOOK = os.getenv('ZOHO_FLOW_WEBHOOK', '')
 ADMIN_USERNAME = os.getenv('ADMIN_USERNAME', 'admin')
 ADMIN_PASSWORD = os.getenv('ADMIN_PASSWORD', 'secure123')
 
+# OCR runs in its own process pool so Tesseract's CPU time stays off the web workers; the request still waits for it
+OCR_MAX_WORKERS = int(os.getenv('OCR_MAX_WORKERS', '2'))
+OCR_MAX_PAGES = int(os.getenv('OCR_MAX_PAGES', '10'))
+OCR_DOCUMENT_TIMEOUT = int(os.getenv('OCR_DOCUMENT_TIMEOUT', '60'))
+OCR_LANGUAGES = os.getenv('OCR_LANGUAGES', 'eng')
+OCR_CACHE_MAX_FILES = int(os.getenv('OCR_CACHE_MAX_FILES', '5000'))
+OCR_MIN_DPI = 150
+OCR_MAX_DPI = 300
+
+_ocr_pool = None
+_ocr_pool_lock = threading.Lock()
+
+DEFAULT_RATE_LIMITS = {
+    "upload_rate_per_minute": 10,
+    "upload_burst": 5,
+    "tenants": {},
+    "max_concurrent_extractions": 4,
+    "max_concurrent_ocr": 4,
+    "max_concurrent_llm_calls": 4,
+    "max_queued_uploads": 16,
+    "queue_timeout_seconds": 30,
+    "overload_retry_after_seconds": 10
+}
+TENANT_LIMIT_KEYS = ['upload_rate_per_minute', 'upload_burst']
+STAGE_LIMIT_KEYS = {
+    'extraction': 'max_concurrent_extractions',
+    'ocr': 'max_concurrent_ocr',
+    'llm': 'max_concurrent_llm_calls'
+}
+# Upper bounds for configured limits; waits longer than this overflow Condition.wait and no deployment needs them
+LIMIT_SECONDS_KEYS = ['queue_timeout_seconds', 'overload_retry_after_seconds']
+MAX_LIMIT_SECONDS = 3600
+MAX_LIMIT_COUNT = 10000
+TOKEN_BUCKET_SWEEP_SECONDS = 60
+
+# Limiter state is per process; under gunicorn each worker enforces the limits on its own
+_token_buckets = {}
+_token_buckets_lock = threading.Lock()
+_token_buckets_swept = time.monotonic()
+_stage_condition = threading.Condition()
+_stage_active = {'extraction': 0, 'ocr': 0, 'llm': 0}
+_stage_waiting = {'extraction': 0, 'ocr': 0, 'llm': 0}
+_upload_metrics = {'accepted': 0, 'rate_limited': 0, 'queue_full': 0, 'queue_timeouts': 0, 'queued': 0}
+
 def require_auth(f):
     @wraps(f)
     def decorated(*args, **kwargs):
@@ -78,6 +179,129 @@ def require_auth(f):
         return f(*args, **kwargs)
     return decorated
 
+def get_rate_limit_settings():
+    settings = dict(DEFAULT_RATE_LIMITS)
+    if os.path.exists(RATE_LIMITS_FILE):
+        with open(RATE_LIMITS_FILE, 'r') as f:
+            settings.update(json.load(f))
+    return settings
+
+def _is_limit_number(value, maximum):
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value) and 0 <= value <= maximum
+
+def validate_rate_limits(updates):
+    if not isinstance(updates, dict):
+        return False, "Limits must be a JSON object"
+    
+    for key, value in updates.items():
+        if key == 'last_updated':
+            continue
+        if key not in DEFAULT_RATE_LIMITS:
+            return False, f"Unknown limit: {key}"
+        if key == 'tenants':
+            if not isinstance(value, dict) or not all(isinstance(tenant, dict) for tenant in value.values()):
+                return False, "tenants must map API keys to objects"
+            for api_key, tenant in value.items():
+                for tenant_key, tenant_value in tenant.items():
+                    if tenant_key not in TENANT_LIMIT_KEYS:
+                        return False, f"Unknown limit for tenant {api_key}: {tenant_key}"
+                    if not _is_limit_number(tenant_value, MAX_LIMIT_COUNT):
+                        return False, f"{tenant_key} for tenant {api_key} must be a number from 0 to {MAX_LIMIT_COUNT}"
+        else:
+            maximum = MAX_LIMIT_SECONDS if key in LIMIT_SECONDS_KEYS else MAX_LIMIT_COUNT
+            if not _is_limit_number(value, maximum):
+                return False, f"{key} must be a number from 0 to {maximum}"
+    
+    return True, "Valid limits"
+
+def save_rate_limit_settings(settings):
+    settings['last_updated'] = datetime.now().isoformat()
+    _write_json_atomic(RATE_LIMITS_FILE, settings, indent=2)
+
+def get_client_limits(limits):
+    # Only keys configured as tenants get their own bucket, so rotating made-up keys doesn't dodge the IP limit
+    api_key = request.headers.get('X-API-Key', '')
+    tenant = limits['tenants'].get(api_key) if api_key else None
+    if tenant is not None:
+        return (
+            f"key:{api_key}",
+            tenant.get('upload_rate_per_minute', limits['upload_rate_per_minute']),
+            tenant.get('upload_burst', limits['upload_burst'])
+        )
+    return f"ip:{request.remote_addr}", limits['upload_rate_per_minute'], limits['upload_burst']
+
+def take_upload_token(client_key, rate_per_minute, burst):
+    global _token_buckets_swept
+    now = time.monotonic()
+    with _token_buckets_lock:
+        if now - _token_buckets_swept >= TOKEN_BUCKET_SWEEP_SECONDS:
+            # Forget clients whose buckets have refilled at their own rate; they would start full anyway
+            for key, (tokens, last, rate, size) in list(_token_buckets.items()):
+                if tokens + (now - last) * rate / 60 >= size:
+                    del _token_buckets[key]
+            _token_buckets_swept = now
+        
+        tokens, last, _, _ = _token_buckets.get(client_key, (burst, now, rate_per_minute, burst))
+        tokens = min(burst, tokens + (now - last) * rate_per_minute / 60)
+        if tokens >= 1:
+            _token_buckets[client_key] = (tokens - 1, now, rate_per_minute, burst)
+            return True, 0
+        _token_buckets[client_key] = (tokens, now, rate_per_minute, burst)
+        if rate_per_minute <= 0:
+            return False, 60
+        return False, math.ceil((1 - tokens) * 60 / rate_per_minute)
+
+@contextmanager
+def stage_slot(stage, limits):
+    # Yields False if the shared queue was full or no slot freed up in time; the caller should answer 503
+    limit = limits[STAGE_LIMIT_KEYS[stage]]
+    deadline = time.monotonic() + limits['queue_timeout_seconds']
+    acquired = False
+    with _stage_condition:
+        # The queue bound is checked and the waiter counted under one lock, so simultaneous arrivals can't all slip past it
+        queue_full = _stage_active[stage] >= limit and sum(_stage_waiting.values()) >= limits['max_queued_uploads']
+        if queue_full:
+            _upload_metrics['queue_full'] += 1
+        elif _stage_active[stage] >= limit:
+            _upload_metrics['queued'] += 1
+            _stage_waiting[stage] += 1
+            try:
+                while _stage_active[stage] >= limit and time.monotonic() < deadline:
+                    _stage_condition.wait(deadline - time.monotonic())
+            finally:
+                _stage_waiting[stage] -= 1
+        if not queue_full and _stage_active[stage] < limit:
+            _stage_active[stage] += 1
+            acquired = True
+        elif not queue_full:
+            _upload_metrics['queue_timeouts'] += 1
+    
+    try:
+        yield acquired
+    finally:
+        if acquired:
+            with _stage_condition:
+                _stage_active[stage] -= 1
+                _stage_condition.notify_all()
+
+def get_upload_metrics():
+    limits = get_rate_limit_settings()
+    stage_limits = {stage: limits[key] for stage, key in STAGE_LIMIT_KEYS.items()}
+    with _stage_condition:
+        metrics = dict(_upload_metrics)
+        metrics['stages'] = {
+            stage: {'active': _stage_active[stage], 'waiting': _stage_waiting[stage], 'limit': stage_limits[stage]}
+            for stage in _stage_active
+        }
+    with _token_buckets_lock:
+        metrics['clients_tracked'] = len(_token_buckets)
+    return metrics
+
+def rejected_response(status_code, message, retry_after):
+    response = jsonify({'error': message, 'status': 'rejected', 'retry_after': retry_after})
+    response.headers['Retry-After'] = str(retry_after)
+    return response, status_code
+
 def validate_file(file):
     if file.filename == '':
         return False, "No file selected"
@@ -154,23 +378,98 @@ def save_scoring_settings(settings):
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
-def extract_text_from_pdf(filepath):
-    text = ""
+def get_ocr_pool():
+    global _ocr_pool
+    with _ocr_pool_lock:
+        if _ocr_pool is None:
+            # Forking this threaded process could copy a lock some other thread holds into the worker, so
+            # workers come from a clean forkserver (spawn where there is none) that has only ocr_worker loaded
+            if 'forkserver' in multiprocessing.get_all_start_methods():
+                context = multiprocessing.get_context('forkserver')
+                context.set_forkserver_preload(['ocr_worker'])
+            else:
+                context = multiprocessing.get_context('spawn')
+            _ocr_pool = ProcessPoolExecutor(max_workers=OCR_MAX_WORKERS, mp_context=context)
+    return _ocr_pool
+
+def discard_ocr_pool(pool):
+    # A broken pool rejects every later job, so the next document gets a fresh one
+    global _ocr_pool
+    with _ocr_pool_lock:
+        if _ocr_pool is pool:
+            _ocr_pool = None
+    pool.shutdown(wait=False)
+
+def choose_ocr_dpi(page):
+    # Render at the scan's own resolution; going higher only gives Tesseract more pixels to read
+    dpis = []
+    for image in page.images:
+        srcsize = image.get('srcsize')
+        if srcsize and image.get('width'):
+            dpis.append(srcsize[0] / (image['width'] / 72))
+    dpi = max(dpis) if dpis else OCR_MAX_DPI
+    return int(min(max(dpi, OCR_MIN_DPI), OCR_MAX_DPI))
+
+class OCRBusyError(Exception):
+    """Raised when the OCR queue is full; callers should ask the client to retry later."""
+
+def run_ocr(filepath, pages):
+    # The ocr stage is the only OCR limit; taking it here covers uploads, retries and DOCX conversions alike
+    if not OCR_AVAILABLE or not pages:
+        return {}
+    
+    with stage_slot('ocr', get_rate_limit_settings()) as acquired:
+        if not acquired:
+            raise OCRBusyError(f"OCR queue full, cannot OCR {filepath}")
+        
+        # The worker stops at the same deadline, so the slot is only freed once the pool is done with the document
+        deadline = time.time() + OCR_DOCUMENT_TIMEOUT
+        pool = get_ocr_pool()
+        try:
+            future = pool.submit(ocr_pdf_pages, filepath, pages[:OCR_MAX_PAGES], deadline,
+                                 OCR_LANGUAGES, OCR_CACHE_FOLDER, OCR_CACHE_MAX_FILES)
+            return future.result(timeout=OCR_DOCUMENT_TIMEOUT)
+        except FutureTimeoutError:
+            # Still waiting behind other documents; a job already running gives up at the deadline by itself
+            future.cancel()
+            print(f"OCR timed out for {filepath} after {OCR_DOCUMENT_TIMEOUT}s")
+            return {}
+        except Exception as e:
+            if isinstance(e, BrokenProcessPool):
+                discard_ocr_pool(pool)
+            print(f"OCR failed for {filepath}: {str(e)}")
+            return {}
+
+def read_pdf_pages(filepath):
+    # Text-layer pass only; returns each page's text and the image-only pages that still need OCR
+    page_texts = []
+    ocr_pages = []
     try:
         with pdfplumber.open(filepath) as pdf:
-            for page in pdf.pages:
+            for page_index, page in enumerate(pdf.pages):
                 page_text = page.extract_text()
-                if page_text:
-                    text += page_text + "\n"
+                page_texts.append(page_text or "")
+                # Only image-only pages (no text layer) are worth sending to OCR
+                if not (page_text and page_text.strip()) and page.images:
+                    ocr_pages.append((page_index, choose_ocr_dpi(page)))
     except (Exception) as e:
         try:
             with open(filepath, 'rb') as file:
                 pdf_reader = PyPDF2.PdfReader(file)
-                for page in pdf_reader.pages:
-                    text += page.extract_text() + "\n"
+                page_texts = [page.extract_text() or "" for page in pdf_reader.pages]
+                ocr_pages = []
         except Exception as fallback_error:
             raise Exception(f"Failed to extract PDF text: {str(e)}, fallback error: {str(fallback_error)}")
-    return text.strip()
+    return page_texts, ocr_pages
+
+def join_pdf_pages(page_texts, ocr_results):
+    for page_index, page_text in ocr_results.items():
+        page_texts[page_index] = page_text
+    return "\n".join(page_text for page_text in page_texts if page_text).strip()
+
+def extract_text_from_pdf(filepath):
+    page_texts, ocr_pages = read_pdf_pages(filepath)
+    return join_pdf_pages(page_texts, run_ocr(filepath, ocr_pages))
 
 def convert_docx_to_pdf(docx_path):
     import re
@@ -248,17 +547,677 @@ def extract_text(filepath, file_extension):
         return extract_text_from_docx(filepath)
     return ""
 
-def get_candidates_db():
+def now_timestamp():
+    return int(datetime.now().timestamp())
+
+def to_timestamp(value):
+    # Records written before the compact format stored ISO strings
+    if isinstance(value, str):
+        return int(datetime.fromisoformat(value).timestamp()) if value else None
+    return value
+
+def format_timestamp(value):
+    return datetime.fromtimestamp(value).isoformat() if value else ''
+
+def _encode_enum(values, value):
+    # Unknown values are kept verbatim so nothing the parser returns is lost
+    return values.index(value) if value in values else value
+
+def _decode_enum(values, value):
+    if isinstance(value, int) and not isinstance(value, bool) and 0 <= value < len(values):
+        return values[value]
+    return value
+
+def encode_candidate(candidate_id, record):
+    compact = dict(record)
+    compact.pop('filepath', None)
+    details = {}
+    if 'raw_text' in compact:
+        details['raw_text'] = compact.pop('raw_text')
+    
+    compact['status'] = _encode_enum(CANDIDATE_STATUSES, compact.get('status'))
+    for field in CANDIDATE_TIMESTAMPS:
+        if field in compact:
+            compact[field] = to_timestamp(compact[field])
+    
+    if compact.get('parsed_data'):
+        data = dict(compact['parsed_data'])
+        for field, values in PARSED_DATA_ENUMS.items():
+            if field in data:
+                data[field] = _encode_enum(values, data[field])
+        
+        # Always replaced so a re-parse without descriptions doesn't resurrect the old ones
+        experience = data.get('experience')
+        if isinstance(experience, list) and any(isinstance(exp, dict) and 'description' in exp for exp in experience):
+            details['experience'] = [exp.get('description', '') if isinstance(exp, dict) else '' for exp in experience]
+            data['experience'] = [
+                {k: v for k, v in exp.items() if k != 'description'} if isinstance(exp, dict) else exp
+                for exp in experience
+            ]
+        else:
+            details['experience'] = []
+        compact['parsed_data'] = data
+    
+    if details:
+        save_candidate_details(candidate_id, details)
+    return compact
+
+def decode_candidate(record):
+    # Decodes in place: records come straight from json.load and are not shared
+    record['status'] = _decode_enum(CANDIDATE_STATUSES, record.get('status'))
+    for field in CANDIDATE_TIMESTAMPS:
+        if isinstance(record.get(field), str):
+            record[field] = to_timestamp(record[field])
+    data = record.get('parsed_data')
+    if data:
+        for field, values in PARSED_DATA_ENUMS.items():
+            if field in data:
+                data[field] = _decode_enum(values, data[field])
+    return record
+
+def _candidate_details_path(candidate_id):
+    return os.path.join(CANDIDATE_DETAILS_FOLDER, hashlib.md5(candidate_id.encode()).hexdigest() + '.json')
+
+def load_candidate_details(candidate_id):
+    path = _candidate_details_path(candidate_id)
+    if os.path.exists(path):
+        with open(path, 'r') as f:
+            return json.load(f)
+    return {}
+
+def _write_json_atomic(path, data, **dump_kwargs):
+    # Write to a temp file and swap it in so readers never see a half-written file
+    content = json.dumps(data, **dump_kwargs)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, 'w') as f:
+        f.write(content)
+    os.replace(tmp_path, path)
+    return content
+
+def save_candidate_details(candidate_id, details):
+    merged = load_candidate_details(candidate_id)
+    merged.update(details)
+    _write_json_atomic(_candidate_details_path(candidate_id), merged, separators=(',', ':'))
+
+def attach_candidate_details(candidate_id, record):
+    details = load_candidate_details(candidate_id)
+    record['raw_text'] = details.get('raw_text', '')
+    descriptions = details.get('experience', [])
+    data = record.get('parsed_data') or {}
+    for exp, description in zip(data.get('experience') or [], descriptions):
+        if isinstance(exp, dict):
+            exp['description'] = description
+    return record
+
+_candidate_store_lock = threading.RLock()
+_candidate_store_lock_depth = 0
+
+@contextmanager
+def candidate_store_lock():
+    # The RLock serialises this process's threads; the flock serialises gunicorn workers sharing the files
+    global _candidate_store_lock_depth
+    with _candidate_store_lock:
+        if _candidate_store_lock_depth or fcntl is None:
+            _candidate_store_lock_depth += 1
+            try:
+                yield
+            finally:
+                _candidate_store_lock_depth -= 1
+            return
+        with open(CANDIDATES_LOCK_FILE, 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            _candidate_store_lock_depth = 1
+            try:
+                yield
+            finally:
+                _candidate_store_lock_depth = 0
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+def _load_candidate_store():
     if os.path.exists(CANDIDATES_DB_FILE):
         with open(CANDIDATES_DB_FILE, 'r') as f:
             return json.load(f)
     return {}
 
+def _write_candidate_store(store):
+    # Returns the checksum of what was written (the JSON is plain ASCII) for the search index to record
+    content = _write_json_atomic(CANDIDATES_DB_FILE, store, separators=(',', ':'))
+    return hashlib.md5(content.encode()).hexdigest()
+
+def _store_file_hash():
+    if not os.path.exists(CANDIDATES_DB_FILE):
+        return ''
+    with open(CANDIDATES_DB_FILE, 'rb') as f:
+        return hashlib.md5(f.read()).hexdigest()
+
+def _record_hash(compact):
+    # Stored with each indexed row so the search index can tell which records changed since
+    return hashlib.md5(json.dumps(compact, sort_keys=True, separators=(',', ':')).encode()).hexdigest()
+
+def get_candidates_db():
+    # Summary records only; raw text and experience descriptions live in CANDIDATE_DETAILS_FOLDER
+    return {candidate_id: decode_candidate(record) for candidate_id, record in _load_candidate_store().items()}
+
+def get_candidate(candidate_id):
+    record = _load_candidate_store().get(candidate_id)
+    if record is None:
+        return None
+    return attach_candidate_details(candidate_id, decode_candidate(record))
+
 def save_candidate(candidate_id, data):
-    db = get_candidates_db()
-    db[candidate_id] = data
-    with open(CANDIDATES_DB_FILE, 'w') as f:
-        json.dump(db, f, indent=2)
+    # Serialised so concurrent uploads can't lose each other's writes or skew the stats transitions
+    with candidate_store_lock():
+        store = _load_candidate_store()
+        previous = store.get(candidate_id)
+        if previous is not None:
+            previous = decode_candidate(previous)
+        store[candidate_id] = encode_candidate(candidate_id, data)
+        store_hash = _write_candidate_store(store)
+        record_hash = _record_hash(store[candidate_id])
+        
+        try:
+            update_stats(previous, data)
+        except (OSError, ValueError) as e:
+            print(f"Error updating stats for {candidate_id}, rebuilding: {str(e)}")
+            try:
+                rebuild_stats()
+            except (OSError, ValueError) as rebuild_error:
+                print(f"Error rebuilding stats: {str(rebuild_error)}")
+        
+        try:
+            with closing(get_search_index()) as conn, conn:
+                index_candidate(conn, candidate_id, data, record_hash)
+                _set_indexed_store_hash(conn, store_hash)
+            # An earlier write was dropped (e.g. locked by a rebuild); repair it now the index is writable
+            if os.path.exists(SEARCH_INDEX_DIRTY_FILE):
+                sync_search_index()
+        except sqlite3.Error as e:
+            print(f"Error updating search index for {candidate_id}, marking it for repair: {str(e)}")
+            open(SEARCH_INDEX_DIRTY_FILE, 'a').close()
+
+def compact_candidates_db():
+    # One-off migration of records written before the compact format
+    with candidate_store_lock():
+        store = _load_candidate_store()
+        legacy = [
+            candidate_id for candidate_id, record in store.items()
+            if 'raw_text' in record or 'filepath' in record or isinstance(record.get('uploaded_at'), str)
+            or record.get('status') in CANDIDATE_STATUSES
+        ]
+        if not legacy:
+            return 0
+        for candidate_id in legacy:
+            store[candidate_id] = encode_candidate(candidate_id, store[candidate_id])
+        _write_candidate_store(store)
+        return len(legacy)
+
+# OCR workers started while running `python app.py` re-import this file as __mp_main__; they must not migrate or index
+if __name__ != '__mp_main__':
+    compact_candidates_db()
+
+def _empty_stats():
+    stats = {'total': 0, 'synced': 0, 'status': {}, 'daily': {}}
+    for dimension in STATS_DIMENSIONS:
+        stats[dimension] = {}
+    return stats
+
+def _adjust_count(counts, key, delta):
+    if not key:
+        return
+    counts[key] = counts.get(key, 0) + delta
+    if counts[key] <= 0:
+        del counts[key]
+
+def _record_stats_keys(record):
+    data = record.get('parsed_data') or {}
+    keys = {'status': record.get('status', '')}
+    for dimension in STATS_DIMENSIONS:
+        keys[dimension] = data.get(dimension, '')
+    return keys
+
+def _add_daily(stats, timestamp, field):
+    timestamp = to_timestamp(timestamp)
+    if not timestamp:
+        return
+    date = datetime.fromtimestamp(timestamp).strftime('%Y-%m-%d')
+    day = stats['daily'].setdefault(date, {'uploaded': 0, 'processed': 0})
+    day[field] += 1
+
+def apply_stats_transition(stats, previous, current):
+    # Remove the old record's contribution, then add the new one
+    if previous:
+        for dimension, value in _record_stats_keys(previous).items():
+            _adjust_count(stats[dimension], value, -1)
+        stats['synced'] -= 1 if previous.get('synced') else 0
+    else:
+        stats['total'] += 1
+        _add_daily(stats, current.get('uploaded_at'), 'uploaded')
+    
+    for dimension, value in _record_stats_keys(current).items():
+        _adjust_count(stats[dimension], value, 1)
+    stats['synced'] += 1 if current.get('synced') else 0
+    
+    was_processed = previous is not None and previous.get('status') == 'processed'
+    if current.get('status') == 'processed' and not was_processed:
+        _add_daily(stats, current.get('processed_at'), 'processed')
+
+def save_stats(stats):
+    stats['updated_at'] = datetime.now().isoformat()
+    _write_json_atomic(STATS_FILE, stats, indent=2)
+
+def get_stats():
+    # The file is replaced atomically, so reading it needs no lock
+    if os.path.exists(STATS_FILE):
+        try:
+            with open(STATS_FILE, 'r') as f:
+                return json.load(f)
+        except ValueError as e:
+            print(f"Stats file is corrupt, rebuilding: {str(e)}")
+    return rebuild_stats()
+
+def update_stats(previous, current):
+    # Stats are derived from the store, so they share its lock; a rebuild can't interleave with a save
+    with candidate_store_lock():
+        if not os.path.exists(STATS_FILE):
+            rebuild_stats()
+            return
+        with open(STATS_FILE, 'r') as f:
+            stats = json.load(f)
+        apply_stats_transition(stats, previous, current)
+        save_stats(stats)
+
+def rebuild_stats():
+    with candidate_store_lock():
+        stats = _empty_stats()
+        for record in get_candidates_db().values():
+            apply_stats_transition(stats, None, record)
+        stats['rebuilt_at'] = datetime.now().isoformat()
+        save_stats(stats)
+        return stats
+
+def get_search_index():
+    conn = sqlite3.connect(SEARCH_INDEX_FILE, timeout=10)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+def init_search_index():
+    with closing(get_search_index()) as conn, conn:
+        if conn.execute("PRAGMA user_version").fetchone()[0] != SEARCH_INDEX_VERSION:
+            # Schema changed; drop everything and let the row-count check below rebuild it
+            conn.executescript("""
+                DROP TABLE IF EXISTS candidate_fts;
+                DROP TABLE IF EXISTS candidate_languages;
+                DROP TABLE IF EXISTS candidate_index;
+                DROP TABLE IF EXISTS facet_counts;
+                DROP TABLE IF EXISTS language_facet_counts;
+                DROP TABLE IF EXISTS index_state;
+            """)
+            conn.execute(f"PRAGMA user_version = {SEARCH_INDEX_VERSION}")
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS candidate_index (
+                doc_id INTEGER PRIMARY KEY,
+                id TEXT UNIQUE NOT NULL,
+                status TEXT COLLATE NOCASE,
+                name TEXT,
+                email TEXT,
+                tier_level TEXT COLLATE NOCASE,
+                tier_score REAL,
+                primary_language TEXT,
+                service_location TEXT COLLATE NOCASE,
+                education TEXT COLLATE NOCASE,
+                role_relevance TEXT COLLATE NOCASE,
+                qualify TEXT,
+                synced INTEGER,
+                uploaded_at INTEGER,
+                processed_at INTEGER,
+                record_hash TEXT
+            );
+            CREATE TABLE IF NOT EXISTS candidate_languages (
+                doc_id INTEGER NOT NULL,
+                language TEXT NOT NULL COLLATE NOCASE,
+                PRIMARY KEY (doc_id, language)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS idx_candidate_languages ON candidate_languages (language, doc_id);
+            CREATE INDEX IF NOT EXISTS idx_candidate_status ON candidate_index (status);
+            CREATE INDEX IF NOT EXISTS idx_candidate_tier ON candidate_index (tier_level);
+            CREATE INDEX IF NOT EXISTS idx_candidate_location ON candidate_index (service_location);
+            CREATE INDEX IF NOT EXISTS idx_candidate_education ON candidate_index (education);
+            CREATE INDEX IF NOT EXISTS idx_candidate_role ON candidate_index (role_relevance);
+            CREATE INDEX IF NOT EXISTS idx_candidate_processed ON candidate_index (processed_at, uploaded_at);
+            -- Candidate counts per combination of facet values, kept up to date by index_candidate
+            CREATE TABLE IF NOT EXISTS facet_counts (
+                status TEXT NOT NULL COLLATE NOCASE,
+                tier_level TEXT NOT NULL COLLATE NOCASE,
+                service_location TEXT NOT NULL COLLATE NOCASE,
+                education TEXT NOT NULL COLLATE NOCASE,
+                role_relevance TEXT NOT NULL COLLATE NOCASE,
+                total INTEGER NOT NULL,
+                PRIMARY KEY (status, tier_level, service_location, education, role_relevance)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS language_facet_counts (
+                language TEXT NOT NULL COLLATE NOCASE,
+                status TEXT NOT NULL COLLATE NOCASE,
+                tier_level TEXT NOT NULL COLLATE NOCASE,
+                service_location TEXT NOT NULL COLLATE NOCASE,
+                education TEXT NOT NULL COLLATE NOCASE,
+                role_relevance TEXT NOT NULL COLLATE NOCASE,
+                total INTEGER NOT NULL,
+                PRIMARY KEY (language, status, tier_level, service_location, education, role_relevance)
+            ) WITHOUT ROWID;
+            -- Checksum of the candidates_db.json the index was last brought in line with
+            CREATE TABLE IF NOT EXISTS index_state (
+                key TEXT PRIMARY KEY,
+                value TEXT
+            );
+            CREATE VIRTUAL TABLE IF NOT EXISTS candidate_fts USING fts5(
+                name, email, languages, skills, certifications, experience, location, notes,
+                tokenize = 'unicode61 remove_diacritics 2'
+            );
+        """)
+    
+    # Catch up with any records added, changed or removed while the index wasn't being updated
+    sync_search_index()
+
+def sync_search_index(full=False):
+    # BEGIN IMMEDIATE takes the write lock before the store is read, so a concurrent save either
+    # lands in this snapshot or indexes itself after we commit; it can never be overwritten by a stale copy
+    with closing(get_search_index()) as conn, conn:
+        conn.execute("BEGIN IMMEDIATE")
+        dirty = os.path.exists(SEARCH_INDEX_DIRTY_FILE)
+        if dirty:
+            os.remove(SEARCH_INDEX_DIRTY_FILE)
+        
+        # Unchanged file and no dropped writes: skip comparing every record
+        store_hash = _store_file_hash()
+        indexed_hash = conn.execute("SELECT value FROM index_state WHERE key = 'store_hash'").fetchone()
+        if not full and not dirty and indexed_hash and indexed_hash[0] == store_hash:
+            return 0
+        store = _load_candidate_store()
+        
+        if full:
+            conn.execute("DELETE FROM candidate_fts")
+            conn.execute("DELETE FROM candidate_languages")
+            conn.execute("DELETE FROM candidate_index")
+            conn.execute("DELETE FROM facet_counts")
+            conn.execute("DELETE FROM language_facet_counts")
+            indexed = {}
+        else:
+            indexed = {row[0]: row[1] for row in conn.execute("SELECT id, record_hash FROM candidate_index")}
+        
+        for candidate_id in indexed.keys() - store.keys():
+            _unindex_candidate(conn, candidate_id)
+        
+        changed = 0
+        for candidate_id, compact in store.items():
+            record_hash = _record_hash(compact)
+            if indexed.get(candidate_id) != record_hash:
+                record = attach_candidate_details(candidate_id, decode_candidate(compact))
+                index_candidate(conn, candidate_id, record, record_hash)
+                changed += 1
+        _set_indexed_store_hash(conn, store_hash)
+    return changed
+
+def _set_indexed_store_hash(conn, store_hash):
+    conn.execute("INSERT OR REPLACE INTO index_state (key, value) VALUES ('store_hash', ?)", (store_hash,))
+
+def rebuild_search_index():
+    return sync_search_index(full=True)
+
+def _join_list(value):
+    if isinstance(value, list):
+        return ' '.join(str(v) for v in value if v)
+    return str(value or '')
+
+def index_candidate(conn, candidate_id, record, record_hash=None):
+    data = record.get('parsed_data') or {}
+    addr = data.get('address') or {}
+    languages = [data.get('primary_language', '')]
+    if isinstance(data.get('other_spoken_languages'), list):
+        languages += data['other_spoken_languages']
+    languages = list(dict.fromkeys(str(l).strip() for l in languages if l and str(l).strip()))
+    experience = ' '.join(
+        ' '.join(str(exp.get(k, '')) for k in ['company', 'position', 'description'])
+        for exp in data.get('experience', []) if isinstance(exp, dict)
+    )
+    location = ' '.join(str(addr.get(k, '')) for k in ['city', 'state', 'country']) if isinstance(addr, dict) else ''
+    
+    facet_values = {field: str((record if field == 'status' else data).get(field) or '') for field in SEARCH_COUNT_COLUMNS}
+    row = (
+        facet_values['status'],
+        data.get('name', ''),
+        data.get('email', ''),
+        facet_values['tier_level'],
+        data.get('tier_score', 0),
+        data.get('primary_language', ''),
+        facet_values['service_location'],
+        facet_values['education'],
+        facet_values['role_relevance'],
+        data.get('qualify', ''),
+        1 if record.get('synced') else 0,
+        to_timestamp(record.get('uploaded_at')),
+        to_timestamp(record.get('processed_at')),
+        record_hash,
+    )
+    
+    existing = conn.execute(
+        f"SELECT doc_id, {', '.join(SEARCH_COUNT_COLUMNS)} FROM candidate_index WHERE id = ?", (candidate_id,)
+    ).fetchone()
+    if existing:
+        doc_id = existing['doc_id']
+        previous_languages = [r[0] for r in conn.execute("SELECT language FROM candidate_languages WHERE doc_id = ?", (doc_id,))]
+        _adjust_facet_counts(conn, tuple(existing[field] or '' for field in SEARCH_COUNT_COLUMNS), previous_languages, -1)
+        conn.execute("""
+            UPDATE candidate_index SET status = ?, name = ?, email = ?, tier_level = ?, tier_score = ?,
+                primary_language = ?, service_location = ?, education = ?, role_relevance = ?, qualify = ?,
+                synced = ?, uploaded_at = ?, processed_at = ?, record_hash = ?
+            WHERE doc_id = ?
+        """, row + (doc_id,))
+        conn.execute("DELETE FROM candidate_fts WHERE rowid = ?", (doc_id,))
+        conn.execute("DELETE FROM candidate_languages WHERE doc_id = ?", (doc_id,))
+    else:
+        cursor = conn.execute("""
+            INSERT INTO candidate_index (id, status, name, email, tier_level, tier_score,
+                primary_language, service_location, education, role_relevance, qualify,
+                synced, uploaded_at, processed_at, record_hash)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, (candidate_id,) + row)
+        doc_id = cursor.lastrowid
+    
+    conn.execute(
+        "INSERT INTO candidate_fts (rowid, name, email, languages, skills, certifications, experience, location, notes) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        (
+            doc_id,
+            data.get('name', ''),
+            data.get('email', record.get('id', '')),
+            ' '.join(languages),
+            _join_list(data.get('skills')),
+            _join_list(data.get('certifications')),
+            experience,
+            location,
+            data.get('processing_notes', ''),
+        )
+    )
+    conn.executemany(
+        "INSERT OR IGNORE INTO candidate_languages (doc_id, language) VALUES (?, ?)",
+        [(doc_id, language) for language in languages]
+    )
+    # Read back so case-variant duplicates collapse exactly as candidate_languages stored them
+    indexed_languages = [r[0] for r in conn.execute("SELECT language FROM candidate_languages WHERE doc_id = ?", (doc_id,))]
+    _adjust_facet_counts(conn, tuple(facet_values[field] for field in SEARCH_COUNT_COLUMNS), indexed_languages, 1)
+
+def _unindex_candidate(conn, candidate_id):
+    existing = conn.execute(
+        f"SELECT doc_id, {', '.join(SEARCH_COUNT_COLUMNS)} FROM candidate_index WHERE id = ?", (candidate_id,)
+    ).fetchone()
+    if not existing:
+        return
+    doc_id = existing['doc_id']
+    languages = [r[0] for r in conn.execute("SELECT language FROM candidate_languages WHERE doc_id = ?", (doc_id,))]
+    _adjust_facet_counts(conn, tuple(existing[field] or '' for field in SEARCH_COUNT_COLUMNS), languages, -1)
+    conn.execute("DELETE FROM candidate_fts WHERE rowid = ?", (doc_id,))
+    conn.execute("DELETE FROM candidate_languages WHERE doc_id = ?", (doc_id,))
+    conn.execute("DELETE FROM candidate_index WHERE doc_id = ?", (doc_id,))
+
+def _adjust_facet_counts(conn, values, languages, delta):
+    columns = ', '.join(SEARCH_COUNT_COLUMNS)
+    placeholders = ', '.join('?' for _ in SEARCH_COUNT_COLUMNS)
+    key = ' AND '.join(f"{field} = ?" for field in SEARCH_COUNT_COLUMNS)
+    
+    conn.execute(f"""
+        INSERT INTO facet_counts ({columns}, total) VALUES ({placeholders}, ?)
+        ON CONFLICT ({columns}) DO UPDATE SET total = total + excluded.total
+    """, values + (delta,))
+    conn.executemany(f"""
+        INSERT INTO language_facet_counts (language, {columns}, total) VALUES (?, {placeholders}, ?)
+        ON CONFLICT (language, {columns}) DO UPDATE SET total = total + excluded.total
+    """, [(language,) + values + (delta,) for language in languages])
+    
+    if delta < 0:
+        conn.execute(f"DELETE FROM facet_counts WHERE {key} AND total <= 0", values)
+        conn.executemany(
+            f"DELETE FROM language_facet_counts WHERE language = ? AND {key} AND total <= 0",
+            [(language,) + values for language in languages]
+        )
+
+def build_fts_query(text):
+    # Quote every token so user input can never be read as FTS5 syntax; prefix-match each term
+    tokens = re.findall(r'\w+', text)
+    return ' '.join(f'"{token}"*' for token in tokens)
+
+def _indexed_total(conn):
+    return conn.execute("SELECT COALESCE(SUM(total), 0) FROM facet_counts").fetchone()[0]
+
+def _search_text(conn, fts_query, conditions, params, limit, offset):
+    # Materialise the matching doc ids once so paging and every facet count reuse them.
+    # CROSS JOIN keeps SQLite from running the FTS query once per candidate row.
+    conn.execute("PRAGMA temp_store = MEMORY")
+    conn.execute("CREATE TEMP TABLE IF NOT EXISTS search_matches (doc_id INTEGER PRIMARY KEY, rank REAL)")
+    conn.execute("DELETE FROM search_matches")
+    fts = "SELECT rowid AS doc_id, bm25(candidate_fts) AS rank FROM candidate_fts WHERE candidate_fts MATCH ?"
+    if conditions:
+        conn.execute(f"""
+            INSERT INTO search_matches
+            SELECT f.doc_id, f.rank FROM ({fts}) f
+            CROSS JOIN candidate_index ci ON ci.doc_id = f.doc_id
+            WHERE {' AND '.join(conditions)}
+        """, [fts_query] + params)
+    else:
+        conn.execute(f"INSERT INTO search_matches {fts}", (fts_query,))
+    
+    total = conn.execute("SELECT COUNT(*) FROM search_matches").fetchone()[0]
+    
+    # Counting facets over tens of thousands of matches costs more than the search itself,
+    # so past the limit they describe the best-ranked matches only
+    truncated = total > SEARCH_EXACT_FACET_LIMIT
+    sample = 'search_matches'
+    if truncated:
+        conn.execute("CREATE TEMP TABLE IF NOT EXISTS facet_sample (doc_id INTEGER PRIMARY KEY, rank REAL)")
+        conn.execute("DELETE FROM facet_sample")
+        conn.execute("INSERT INTO facet_sample SELECT doc_id, rank FROM search_matches ORDER BY rank LIMIT ?", (SEARCH_EXACT_FACET_LIMIT,))
+        sample = 'facet_sample'
+    sampled_matches = f"{sample} m CROSS JOIN candidate_index ci ON ci.doc_id = m.doc_id"
+    
+    # Pages inside the sample are sorted already-small; deeper pages sort every match
+    page_source = sampled_matches if offset + limit <= SEARCH_EXACT_FACET_LIMIT else "search_matches m CROSS JOIN candidate_index ci ON ci.doc_id = m.doc_id"
+    rows = conn.execute(f"SELECT ci.* FROM {page_source} ORDER BY m.rank LIMIT ? OFFSET ?", (limit, offset)).fetchall()
+    
+    # Few matches: look each one up once and group by every facet column together.
+    # Many matches: walk each facet's index in order and test membership instead.
+    broad = min(total, SEARCH_EXACT_FACET_LIMIT) * 4 >= _indexed_total(conn)
+    facet_columns = [facet for facet in SEARCH_FACETS if facet != 'language']
+    facets = {facet: {} for facet in SEARCH_FACETS}
+    if broad:
+        for facet in facet_columns:
+            sql = f"""
+                SELECT {facet}, COUNT(*) FROM candidate_index INDEXED BY {SEARCH_FACET_INDEXES[facet]}
+                WHERE +doc_id IN (SELECT doc_id FROM {sample}) AND {facet} != '' GROUP BY {facet}
+            """
+            facets[facet] = {row[0]: row[1] for row in conn.execute(sql)}
+        language_sql = f"""
+            SELECT language, COUNT(*) FROM candidate_languages INDEXED BY idx_candidate_languages
+            WHERE +doc_id IN (SELECT doc_id FROM {sample}) GROUP BY language
+        """
+    else:
+        columns = ', '.join(f"ci.{facet}" for facet in facet_columns)
+        for row in conn.execute(f"SELECT {columns}, COUNT(*) FROM {sampled_matches} GROUP BY {columns}"):
+            for facet, value in zip(facet_columns, row):
+                if value:
+                    facets[facet][value] = facets[facet].get(value, 0) + row[-1]
+        language_sql = f"SELECT cl.language, COUNT(*) FROM {sample} m CROSS JOIN candidate_languages cl ON cl.doc_id = m.doc_id GROUP BY cl.language"
+    facets['language'] = {row[0]: row[1] for row in conn.execute(language_sql)}
+    
+    facets = {facet: dict(sorted(counts.items(), key=lambda item: -item[1])) for facet, counts in facets.items()}
+    return total, rows, facets, truncated
+
+def _search_filters(conn, filters, conditions, params, limit, offset):
+    # Without a text query every facet is a GROUP BY over the pre-aggregated count tables,
+    # which hold one row per combination of facet values rather than one per candidate
+    counts_table = 'language_facet_counts' if 'language' in filters else 'facet_counts'
+    count_filters = list(filters)
+    count_params = list(filters.values())
+    
+    def count_where(extra=None):
+        clauses = [f"{field} = ?" for field in count_filters] + ([extra] if extra else [])
+        return f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    
+    total = conn.execute(f"SELECT COALESCE(SUM(total), 0) FROM {counts_table} {count_where()}", count_params).fetchone()[0]
+    
+    # Broad filters: walk candidates newest-first and stop after one page. Narrow filters:
+    # let SQLite use the filter's index and sort the few matches.
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    scan = "INDEXED BY idx_candidate_processed" if total * 20 >= _indexed_total(conn) else ""
+    rows = conn.execute(
+        f"SELECT ci.* FROM candidate_index ci {scan} {where} ORDER BY ci.processed_at DESC, ci.uploaded_at DESC LIMIT ? OFFSET ?",
+        params + [limit, offset]
+    ).fetchall()
+    
+    facets = {}
+    for facet in SEARCH_FACETS:
+        if facet != 'language':
+            facet_where = count_where(f"{facet} != ''")
+            sql = f"SELECT {facet}, SUM(total) FROM {counts_table} {facet_where} GROUP BY {facet} ORDER BY 2 DESC"
+            facets[facet] = {row[0]: row[1] for row in conn.execute(sql, count_params)}
+        elif 'language' not in filters:
+            sql = f"SELECT language, SUM(total) FROM language_facet_counts {count_where()} GROUP BY language ORDER BY 2 DESC"
+            facets[facet] = {row[0]: row[1] for row in conn.execute(sql, count_params)}
+        else:
+            # Languages spoken alongside the filtered one need the per-candidate table
+            sql = f"""
+                SELECT cl.language, COUNT(*) FROM candidate_index ci
+                JOIN candidate_languages cl ON cl.doc_id = ci.doc_id
+                {where} GROUP BY cl.language ORDER BY 2 DESC
+            """
+            facets[facet] = {row[0]: row[1] for row in conn.execute(sql, params)}
+    return total, rows, facets, False
+
+def search_candidates(query='', filters=None, limit=50, offset=0):
+    filters = {field: value for field, value in (filters or {}).items() if value}
+    conditions = []
+    params = []
+    for field, value in filters.items():
+        if field == 'language':
+            conditions.append("ci.doc_id IN (SELECT doc_id FROM candidate_languages WHERE language = ?)")
+        else:
+            conditions.append(f"ci.{field} = ?")
+        params.append(value)
+    
+    fts_query = build_fts_query(query) if query else ''
+    with closing(get_search_index()) as conn:
+        if fts_query:
+            total, rows, facets, truncated = _search_text(conn, fts_query, conditions, params, limit, offset)
+        else:
+            total, rows, facets, truncated = _search_filters(conn, filters, conditions, params, limit, offset)
+    
+    results = []
+    for row in rows:
+        result = {k: row[k] for k in row.keys() if k != 'doc_id'}
+        result['synced'] = bool(result['synced'])
+        results.append(result)
+    
+    return {'total': total, 'results': results, 'facets': facets, 'facets_truncated': truncated}
+
+if __name__ != '__mp_main__':
+    init_search_index()
 
 def generate_identifier(text):
     import re
@@ -411,6 +1370,16 @@ def send_to_zoho_flow(candidate_data):
 
 @app.route('/upload', methods=['POST'])
 def upload_resume():
+    limits = get_rate_limit_settings()
+    
+    # Checked before the request body is parsed so a flooding client costs as little as possible
+    client_key, rate_per_minute, burst = get_client_limits(limits)
+    allowed, retry_after = take_upload_token(client_key, rate_per_minute, burst)
+    if not allowed:
+        with _stage_condition:
+            _upload_metrics['rate_limited'] += 1
+        return rejected_response(429, 'Too many uploads, please slow down', retry_after)
+    
     if 'file' not in request.files:
         return jsonify({'error': 'No file provided'}), 400
     
@@ -425,9 +1394,27 @@ def upload_resume():
     file_extension = filename.rsplit('.', 1)[1].lower()
     filepath = os.path.join(UPLOAD_FOLDER, filename)
     
-    file.save(filepath)
+    with stage_slot('extraction', limits) as acquired:
+        if not acquired:
+            return rejected_response(503, 'Server is busy processing other resumes', limits['overload_retry_after_seconds'])
+        file.save(filepath)
+        page_texts, ocr_pages = [], []
+        try:
+            if file_extension == 'pdf':
+                page_texts, ocr_pages = read_pdf_pages(filepath)
+            else:
+                page_texts = [extract_text(filepath, file_extension)]
+        except OCRBusyError as e:
+            print(str(e))
+            return rejected_response(503, 'Server is busy reading other scanned resumes', limits['overload_retry_after_seconds'])
     
-    text = extract_text(filepath, file_extension)
+    # OCR can take a minute, so it waits in its own stage (inside run_ocr) instead of holding an extraction slot
+    try:
+        ocr_results = run_ocr(filepath, ocr_pages)
+    except OCRBusyError as e:
+        print(str(e))
+        return rejected_response(503, 'Server is busy reading other scanned resumes', limits['overload_retry_after_seconds'])
+    text = clean_and_fix_text(join_pdf_pages(page_texts, ocr_results))
     
     if not text:
         return jsonify({'error': 'Could not extract text from file', 'status': 'failed'}), 400
@@ -437,33 +1424,37 @@ def upload_resume():
     if not identifier:
         identifier = hashlib.md5(filename.encode()).hexdigest()
     
-    db = get_candidates_db()
+    existing = get_candidate(identifier)
     
-    if identifier in db:
-        existing = db[identifier]
-        if existing['status'] == 'processed':
-            return jsonify({
-                'message': 'Duplicate resume detected',
-                'status': 'duplicate',
-                'data': existing
-            }), 200
+    if existing and existing['status'] == 'processed':
+        return jsonify({
+            'message': 'Duplicate resume detected',
+            'status': 'duplicate',
+            'data': existing
+        }), 200
     
     settings = get_scoring_settings()
     candidate_record = {
         'id': identifier,
         'filename': filename,
-        'filepath': filepath,
         'status': 'uploaded',
         'retry_count': 0,
         'synced': False,
-        'uploaded_at': datetime.now().isoformat(),
+        'uploaded_at': now_timestamp(),
         'raw_text': text[:1000],
         'scoring_version': settings.get('version', '1.0')
     }
     
     save_candidate(identifier, candidate_record)
     
-    parsed_data, error = parse_resume_with_openai(text)
+    with stage_slot('llm', limits) as acquired:
+        if not acquired:
+            # The record stays 'uploaded' so it can be retried from the dashboard
+            return rejected_response(503, 'Server is busy processing other resumes', limits['overload_retry_after_seconds'])
+        # Counted only once the upload holds every slot it needs, so it matches work actually admitted
+        with _stage_condition:
+            _upload_metrics['accepted'] += 1
+        parsed_data, error = parse_resume_with_openai(text)
     
     if error:
         candidate_record['retry_count'] += 1
@@ -478,12 +1469,12 @@ def upload_resume():
         
         candidate_record['status'] = 'processed'
         candidate_record['parsed_data'] = parsed_data
-        candidate_record['processed_at'] = datetime.now().isoformat()
+        candidate_record['processed_at'] = now_timestamp()
         
         success, message = send_to_zoho_flow(parsed_data)
         if success:
             candidate_record['synced'] = True
-            candidate_record['zoho_synced_at'] = datetime.now().isoformat()
+            candidate_record['zoho_synced_at'] = now_timestamp()
         
         save_candidate(identifier, candidate_record)
         
@@ -524,11 +1515,20 @@ def retry_candidate(candidate_id):
     if candidate['status'] == 'processed':
         return jsonify({'message': 'Candidate already processed'}), 200
     
-    text = candidate.get('raw_text', '')
+    limits = get_rate_limit_settings()
+    text = load_candidate_details(candidate_id).get('raw_text', '')
     if not text:
-        text = extract_text(candidate['filepath'], candidate['filename'].rsplit('.', 1)[1].lower())
+        filepath = os.path.join(UPLOAD_FOLDER, candidate['filename'])
+        try:
+            text = extract_text(filepath, candidate['filename'].rsplit('.', 1)[1].lower())
+        except OCRBusyError as e:
+            print(str(e))
+            return rejected_response(503, 'Server is busy reading other scanned resumes', limits['overload_retry_after_seconds'])
     
-    parsed_data, error = parse_resume_with_openai(text)
+    with stage_slot('llm', limits) as acquired:
+        if not acquired:
+            return rejected_response(503, 'Server is busy processing other resumes', limits['overload_retry_after_seconds'])
+        parsed_data, error = parse_resume_with_openai(text)
     
     if error:
         candidate['retry_count'] += 1
@@ -543,12 +1543,12 @@ def retry_candidate(candidate_id):
         
         candidate['status'] = 'processed'
         candidate['parsed_data'] = parsed_data
-        candidate['processed_at'] = datetime.now().isoformat()
+        candidate['processed_at'] = now_timestamp()
         
         success, message = send_to_zoho_flow(parsed_data)
         if success:
             candidate['synced'] = True
-            candidate['zoho_synced_at'] = datetime.now().isoformat()
+            candidate['zoho_synced_at'] = now_timestamp()
         
         save_candidate(candidate_id, candidate)
         
@@ -587,6 +1587,161 @@ def get_candidates():
     
     return jsonify(db), 200
 
+@app.route('/candidates/<candidate_id>', methods=['GET'])
+@require_auth
+def get_candidate_detail(candidate_id):
+    candidate = get_candidate(candidate_id)
+    if candidate is None:
+        return jsonify({'error': 'Candidate not found'}), 404
+    return jsonify(candidate), 200
+
+@app.route('/search', methods=['GET'])
+@require_auth
+def search():
+    query = request.args.get('q', '').strip()
+    filters = {
+        'status': request.args.get('status'),
+        'tier_level': request.args.get('tier'),
+        'language': request.args.get('language'),
+        'service_location': request.args.get('location'),
+        'education': request.args.get('education'),
+        'role_relevance': request.args.get('role_relevance'),
+    }
+    
+    try:
+        limit = min(max(int(request.args.get('limit', 50)), 1), SEARCH_MAX_LIMIT)
+        offset = max(int(request.args.get('offset', 0)), 0)
+    except ValueError:
+        return jsonify({'error': 'limit and offset must be integers'}), 400
+    
+    try:
+        results = search_candidates(query, filters, limit, offset)
+    except sqlite3.Error as e:
+        return jsonify({'error': f'Search failed: {str(e)}'}), 500
+    
+    return jsonify(results), 200
+
+@app.route('/search/rebuild', methods=['POST'])
+@require_auth
+def rebuild_search():
+    count = rebuild_search_index()
+    return jsonify({'message': 'Search index rebuilt', 'indexed': count}), 200
+
+@app.route('/stats', methods=['GET'])
+@require_auth
+def dashboard_stats():
+    return jsonify(get_stats()), 200
+
+@app.route('/stats/rebuild', methods=['POST'])
+@require_auth
+def rebuild_dashboard_stats():
+    return jsonify({'message': 'Stats rebuilt', 'stats': rebuild_stats()}), 200
+
+@app.cli.command('rebuild-stats')
+def rebuild_stats_command():
+    """Recompute candidate_stats.json from candidates_db.json."""
+    stats = rebuild_stats()
+    print(f"Rebuilt stats for {stats['total']} candidates")
+
+@app.cli.command('ocr-benchmark')
+@click.argument('folder')
+def ocr_benchmark_command(folder):
+    """Measure PDF extraction throughput, including OCR, over a folder of scanned PDFs."""
+    files = sorted(os.path.join(folder, f) for f in os.listdir(folder) if f.lower().endswith('.pdf'))
+    if not files:
+        print(f"No PDF files found in {folder}")
+        return
+    if not OCR_AVAILABLE:
+        print("pytesseract is not installed; scanned pages will not be OCR'd")
+    
+    pages = 0
+    for path in files:
+        with pdfplumber.open(path) as pdf:
+            pages += len(pdf.pages)
+    
+    # As many documents in flight as the ocr stage admits; the second pass reads every page from the OCR cache
+    concurrency = max(1, int(get_rate_limit_settings()['max_concurrent_ocr']))
+    for label in ['first pass', 'second pass']:
+        start = time.monotonic()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            texts = list(executor.map(extract_text_from_pdf, files))
+        elapsed = time.monotonic() - start
+        empty = sum(1 for text in texts if not text)
+        print(f"{label}: {len(files)} documents, {pages} pages in {elapsed:.1f}s "
+              f"({len(files) / elapsed:.2f} docs/s, {pages / elapsed:.2f} pages/s), {empty} without text")
+
+@app.cli.command('ocr-fixtures')
+@click.argument('folder')
+@click.option('--count', default=8, help='Number of PDFs to generate.')
+@click.option('--pages', default=2, help='Scanned pages per PDF.')
+@click.option('--dpi', default=200, help='Resolution the pages are "scanned" at.')
+def ocr_fixtures_command(folder, count, pages, dpi):
+    """Generate image-only resume PDFs for ocr-benchmark."""
+    import random
+    from PIL import Image, ImageDraw, ImageFont
+
+    words = ['interpreter', 'medical', 'legal', 'Spanish', 'Portuguese', 'certified', 'court', 'remote',
+             'video', 'consecutive', 'simultaneous', 'hospital', 'clinic', 'patients', 'terminology',
+             'Texas', 'Florida', 'Boston', 'years', 'experience', 'translation', 'HIPAA', 'community']
+    os.makedirs(folder, exist_ok=True)
+    font = ImageFont.load_default(size=dpi // 6)
+    for doc_index in range(count):
+        # Seeded so every run produces the same fixture set
+        rng = random.Random(doc_index)
+        images = []
+        for page_index in range(pages):
+            image = Image.new('L', (int(8.5 * dpi), 11 * dpi), 255)
+            draw = ImageDraw.Draw(image)
+            lines = [f"Candidate {doc_index + 1} - page {page_index + 1}", f"candidate{doc_index + 1}@example.com"]
+            lines += [" ".join(rng.choice(words) for _ in range(8)) for _ in range(30)]
+            for line_index, line in enumerate(lines):
+                draw.text((dpi, dpi + line_index * dpi // 4), line, fill=0, font=font)
+            images.append(image)
+        path = os.path.join(folder, f"scanned_resume_{doc_index + 1:02d}.pdf")
+        images[0].save(path, 'PDF', resolution=dpi, save_all=True, append_images=images[1:])
+    print(f"Wrote {count} scanned PDFs ({pages} pages each, {dpi} DPI) to {folder}")
+
+@app.cli.command('upload-loadtest')
+@click.argument('folder')
+@click.option('--url', default='http://127.0.0.1:5001/upload', help='Upload endpoint of a running server.')
+@click.option('--clients', default=20, help='Simulated clients uploading at the same time.')
+@click.option('--uploads', default=5, help='Uploads per client.')
+def upload_loadtest_command(folder, url, clients, uploads):
+    """Send concurrent uploads from simulated clients and report responses and latency."""
+    files = sorted(os.path.join(folder, f) for f in os.listdir(folder) if allowed_file(f))
+    if not files:
+        print(f"No resume files found in {folder}")
+        return
+
+    def run_client(client_index):
+        # Each client gets its own address, honoured when the server runs with TRUSTED_PROXY_COUNT=1
+        headers = {'X-Forwarded-For': f"10.0.{client_index // 256}.{client_index % 256}"}
+        results = []
+        for upload_index in range(uploads):
+            path = files[(client_index * uploads + upload_index) % len(files)]
+            start = time.monotonic()
+            try:
+                with open(path, 'rb') as f:
+                    response = requests.post(url, files={'file': (os.path.basename(path), f)}, headers=headers, timeout=600)
+                status = response.status_code
+            except requests.RequestException as e:
+                print(f"Upload of {path} failed: {str(e)}")
+                status = 'error'
+            results.append((status, time.monotonic() - start))
+        return results
+
+    start = time.monotonic()
+    with ThreadPoolExecutor(max_workers=clients) as executor:
+        results = [result for client_results in executor.map(run_client, range(clients)) for result in client_results]
+    elapsed = time.monotonic() - start
+
+    print(f"{len(results)} uploads from {clients} clients in {elapsed:.1f}s ({len(results) / elapsed:.2f} uploads/s)")
+    for status in sorted({status for status, _ in results}, key=str):
+        latencies = sorted(latency for result_status, latency in results if result_status == status)
+        p50 = latencies[len(latencies) // 2]
+        p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+        print(f"  {status}: {len(latencies)} responses, p50 {p50:.2f}s, p95 {p95:.2f}s, max {latencies[-1]:.2f}s")
+
 @app.route('/settings', methods=['GET'])
 @require_auth
 def get_settings():
@@ -599,6 +1754,29 @@ def update_settings():
     save_scoring_settings(new_settings)
     return jsonify({'message': 'Settings updated successfully', 'settings': new_settings}), 200
 
+@app.route('/limits', methods=['GET'])
+@require_auth
+def get_limits():
+    return jsonify(get_rate_limit_settings()), 200
+
+@app.route('/limits', methods=['POST'])
+@require_auth
+def update_limits():
+    updates = request.get_json(silent=True)
+    is_valid, error_message = validate_rate_limits(updates)
+    if not is_valid:
+        return jsonify({'error': error_message}), 400
+    
+    new_limits = get_rate_limit_settings()
+    new_limits.update(updates)
+    save_rate_limit_settings(new_limits)
+    return jsonify({'message': 'Limits updated successfully', 'limits': new_limits}), 200
+
+@app.route('/limits/metrics', methods=['GET'])
+@require_auth
+def limits_metrics():
+    return jsonify(get_upload_metrics()), 200
+
 @app.route('/settings/page')
 @require_auth
 def settings_page():
@@ -657,8 +1835,8 @@ def export_csv():
             'Yes' if data.get('training_needed') else 'No',
             data.get('processing_notes', ''),
             candidate.get('status', ''),
-            candidate.get('uploaded_at', ''),
-            candidate.get('processed_at', ''),
+            format_timestamp(candidate.get('uploaded_at')),
+            format_timestamp(candidate.get('processed_at')),
             'Yes' if candidate.get('synced') else 'No',
             ', '.join(filter(None, address_parts))
         ]
@@ -720,8 +1898,8 @@ def export_excel():
             'Yes' if data.get('training_needed') else 'No',
             data.get('processing_notes', ''),
             candidate.get('status', ''),
-            candidate.get('uploaded_at', ''),
-            candidate.get('processed_at', ''),
+            format_timestamp(candidate.get('uploaded_at')),
+            format_timestamp(candidate.get('processed_at')),
             'Yes' if candidate.get('synced') else 'No',
             ', '.join(filter(None, address_parts))
         ]
@@ -0,0 +1,77 @@
+import os
+import time
+import hashlib
+import pdfplumber
+try:
+    import pytesseract
+    OCR_AVAILABLE = True
+except ImportError:
+    OCR_AVAILABLE = False
+
+# Imported by the OCR pool's worker processes, so it must stay free of import-time side effects:
+# importing app.py migrates the candidate store and syncs the search index
+
+def prune_ocr_cache(cache_folder, max_files):
+    # Oldest first; cache hits refresh a page's mtime, so pages that keep being uploaded survive
+    entries = []
+    for name in os.listdir(cache_folder):
+        if not name.endswith('.txt'):
+            continue
+        path = os.path.join(cache_folder, name)
+        try:
+            entries.append((os.path.getmtime(path), path))
+        except FileNotFoundError:
+            continue
+    entries.sort()
+    removed = 0
+    for _, path in entries[:max(0, len(entries) - max_files)]:
+        try:
+            os.remove(path)
+            removed += 1
+        except FileNotFoundError:
+            pass
+    return removed
+
+def ocr_pdf_pages(filepath, pages, deadline, languages, cache_folder, cache_max_files):
+    # pages is a list of (page_index, dpi); deadline is a time.time() shared with the waiting request,
+    # so a job the request has given up on stops instead of holding a worker
+    results = {}
+    cached_new_pages = False
+    with pdfplumber.open(filepath) as pdf:
+        for page_index, dpi in pages:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                break
+            
+            image = pdf.pages[page_index].to_image(resolution=dpi).original
+            page_hash = hashlib.sha256(f"{image.mode}{image.size}{languages}".encode() + image.tobytes()).hexdigest()
+            cache_path = os.path.join(cache_folder, page_hash + '.txt')
+            try:
+                os.utime(cache_path)
+                with open(cache_path, 'r') as f:
+                    results[page_index] = f.read()
+                continue
+            except FileNotFoundError:
+                pass
+            
+            try:
+                text = pytesseract.image_to_string(image, lang=languages, timeout=remaining)
+            except RuntimeError as e:
+                # pytesseract raises RuntimeError when it kills tesseract on timeout
+                print(f"OCR stopped on page {page_index + 1} of {filepath}: {str(e)}")
+                break
+            except pytesseract.TesseractNotFoundError as e:
+                # Re-raised as a plain error: pytesseract's exceptions can't be unpickled and would break the pool
+                raise RuntimeError(str(e))
+            
+            # Written aside and renamed so a reader never sees half a page
+            tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w') as f:
+                f.write(text)
+            os.replace(tmp_path, cache_path)
+            cached_new_pages = True
+            results[page_index] = text
+    
+    if cached_new_pages:
+        prune_ocr_cache(cache_folder, cache_max_files)
+    return results